@@ -3,18 +3,44 @@ Configuration management using environment variables.
 Follows 12-factor app principles.
 """
 
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
     
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
+    
     # Database
     DATABASE_URL: str = Field(
         default="sqlite:////data/app.db",
         description="SQLite database URL",
     )
+    DB_POOL_SIZE: int = Field(
+        default=4,
+        ge=1,
+        description="Number of pooled read connections",
+    )
+    # Each row binds 5 parameters; SQLite allows at most 32766 per statement
+    INSERT_BATCH_SIZE: int = Field(
+        default=64,
+        ge=1,
+        le=32766 // 5,
+        description="Maximum messages committed in one write transaction",
+    )
+    INSERT_BATCH_WINDOW_MS: float = Field(
+        default=5.0,
+        ge=0,
+        description="Time to wait for more messages before committing a batch",
+    )
+    STATS_CACHE_TTL_SECONDS: float = Field(
+        default=2.0,
+        ge=0,
+        description="How long /stats results are reused between writes",
+    )
     
     # Logging
     LOG_LEVEL: str = Field(
@@ -27,11 +53,23 @@ class Settings(BaseSettings):
         default="",
         description="HMAC secret for webhook signature verification",
     )
+    WEBHOOK_MAX_BODY_BYTES: int = Field(
+        default=65536,
+        ge=1,
+        description="Largest accepted webhook body in bytes",
+    )
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    @property
+    def db_path(self) -> str:
+        """Filesystem path of the SQLite database from DATABASE_URL."""
+        return self.DATABASE_URL.replace("sqlite:///", "")
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings once; later calls return the cached instance."""
+    return Settings()
 
 
 # Global settings instance
-settings = Settings()
+settings = get_settings()
@@ -4,55 +4,49 @@ One JSON line per request for easy aggregation and analysis.
 """
 
 import logging
-import json
 import sys
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Dict, Any
+
+import orjson
+
 from app.config import settings
 
 
+# Structured fields copied from log records into the JSON line
+_KNOWN_EXTRAS = (
+    "request_id",
+    "method",
+    "path",
+    "status",
+    "latency_ms",
+    "message_id",
+    "dup",
+    "result",
+    "error",
+    "signature",
+    "content_length",
+)
+
+
 class JSONFormatter(logging.Formatter):
     """Custom formatter to output logs as JSON."""
     
     def format(self, record: logging.LogRecord) -> str:
         """Format log record as JSON string."""
         log_data = {
-            "ts": datetime.utcnow().isoformat() + "Z",
+            "ts": datetime.now(timezone.utc),
             "level": record.levelname,
             "message": record.getMessage(),
         }
         
         # Add extra fields if present
-        if hasattr(record, "request_id"):
-            log_data["request_id"] = record.request_id
-        if hasattr(record, "method"):
-            log_data["method"] = record.method
-        if hasattr(record, "path"):
-            log_data["path"] = record.path
-        if hasattr(record, "status"):
-            log_data["status"] = record.status
-        if hasattr(record, "latency_ms"):
-            log_data["latency_ms"] = record.latency_ms
-        if hasattr(record, "message_id"):
-            log_data["message_id"] = record.message_id
-        if hasattr(record, "dup"):
-            log_data["dup"] = record.dup
-        if hasattr(record, "result"):
-            log_data["result"] = record.result
+        record_dict = record.__dict__
+        for key in _KNOWN_EXTRAS:
+            if key in record_dict:
+                log_data[key] = record_dict[key]
         
-        # Add any other extra attributes
-        for key, value in record.__dict__.items():
-            if key not in [
-                "name", "msg", "args", "created", "filename", "funcName",
-                "levelname", "levelno", "lineno", "module", "msecs",
-                "message", "pathname", "process", "processName",
-                "relativeCreated", "thread", "threadName", "exc_info",
-                "exc_text", "stack_info", "request_id", "method", "path",
-                "status", "latency_ms", "message_id", "dup", "result"
-            ]:
-                log_data[key] = value
-        
-        return json.dumps(log_data)
+        return orjson.dumps(log_data, option=orjson.OPT_UTC_Z).decode()
 
 
 # Configure logger
@@ -71,6 +65,41 @@ logger.addHandler(handler)
 logger.propagate = False
 
 
+def fast_log(log_data: Dict[str, Any]):
+    """
+    Write an INFO request line straight to the log stream.
+    Produces the same JSON shape as JSONFormatter without building a
+    LogRecord or running the handler chain.
+    
+    Args:
+        log_data: Dictionary with request metadata
+    """
+    line = orjson.dumps(
+        {
+            "ts": datetime.now(timezone.utc),
+            "level": "INFO",
+            "message": "",
+            **log_data,
+        },
+        option=orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE,
+    )
+    # Like Handler.emit, a failed write (e.g. a broken stdout pipe) is
+    # reported through handleError and never changes the response
+    try:
+        stream = handler.stream
+        stream.write(line.decode())
+        stream.flush()
+    except Exception:
+        record = logging.makeLogRecord({
+            "name": logger.name,
+            "levelno": logging.INFO,
+            "levelname": "INFO",
+            "msg": "",
+            **log_data,
+        })
+        handler.handleError(record)
+
+
 def log_request(log_data: Dict[str, Any]):
     """
     Log a request with structured data.
@@ -87,9 +116,16 @@ def log_request(log_data: Dict[str, Any]):
     else:
         level = logging.INFO
     
-    # Create log record with extra fields
-    logger.log(
-        level,
-        f"{log_data.get('method')} {log_data.get('path')} -> {status}",
-        extra=log_data,
-    )
+    # Skip record construction entirely for filtered levels
+    if not logger.isEnabledFor(level):
+        return
+    
+    # Successful requests bypass stdlib logging; errors keep the full
+    # logging machinery
+    if level == logging.INFO:
+        fast_log(log_data)
+        return
+    
+    # Create log record with extra fields; method, path and status are
+    # emitted as structured fields, so the message itself is left empty
+    logger.log(level, "", extra=log_data)
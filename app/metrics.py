@@ -3,6 +3,7 @@ Prometheus metrics collection and exposition.
 Tracks HTTP requests, webhook outcomes, and request latencies.
 """
 
+from functools import lru_cache
 from prometheus_client import Counter, Histogram, generate_latest, REGISTRY
 from prometheus_client.core import CollectorRegistry
 
@@ -36,6 +37,26 @@ request_latency_histogram = Histogram(
 )
 
 
+# Path label used for requests that did not match any route
+UNMATCHED_PATH = "__unmatched__"
+
+
+@lru_cache(maxsize=256)
+def http_requests_child(method: str, path: str, status: int):
+    """
+    Get the http_requests_total child for a label set.
+    Cached to skip the label lookup on every request; path must be a
+    route template so the number of label sets stays bounded.
+    """
+    return http_requests_total.labels(method=method, path=path, status=status)
+
+
+@lru_cache(maxsize=256)
+def request_latency_child(method: str, path: str):
+    """Get the request_latency_ms child for a label set (cached)."""
+    return request_latency_histogram.labels(method=method, path=path)
+
+
 def generate_metrics() -> str:
     """
     Generate Prometheus-style metrics in text format.
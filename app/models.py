@@ -3,62 +3,232 @@ Database models and initialization.
 SQLite schema with idempotency enforcement.
 """
 
+import asyncio
 import aiosqlite
 from contextlib import asynccontextmanager
+from typing import Optional
 from app.config import settings
 
 
-# Schema definition
-CREATE_TABLE_SQL = """
-CREATE TABLE IF NOT EXISTS messages (
+# Schema definition; created_at is filled in by SQLite on insert
+MESSAGES_COLUMNS_SQL = """
     message_id TEXT PRIMARY KEY,
     from_msisdn TEXT NOT NULL,
     to_msisdn TEXT NOT NULL,
     ts TEXT NOT NULL,
     text TEXT,
-    created_at TEXT NOT NULL
-);
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
 """
 
-# Index for common queries
+CREATE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS messages ({MESSAGES_COLUMNS_SQL});
+"""
+
+# Rebuild a messages table created before created_at had a default.
+# Rowids are copied so the full-text index stays aligned.
+MIGRATE_CREATED_AT_DEFAULT_SQL = [
+    "DROP TABLE IF EXISTS messages_migrated;",
+    f"CREATE TABLE messages_migrated ({MESSAGES_COLUMNS_SQL});",
+    """
+    INSERT INTO messages_migrated (rowid, message_id, from_msisdn, to_msisdn, ts, text, created_at)
+    SELECT rowid, message_id, from_msisdn, to_msisdn, ts, text, created_at FROM messages;
+    """,
+    "DROP TABLE messages;",
+    "ALTER TABLE messages_migrated RENAME TO messages;",
+]
+
+# Indexes for common queries; the composite indexes match the
+# ORDER BY ts, message_id of /messages so pages are read without a sort
 CREATE_INDEXES_SQL = [
-    "CREATE INDEX IF NOT EXISTS idx_from_msisdn ON messages(from_msisdn);",
-    "CREATE INDEX IF NOT EXISTS idx_ts ON messages(ts);",
+    "CREATE INDEX IF NOT EXISTS idx_ts_msgid ON messages(ts, message_id);",
+    "CREATE INDEX IF NOT EXISTS idx_from_ts ON messages(from_msisdn, ts, message_id);",
     "CREATE INDEX IF NOT EXISTS idx_created_at ON messages(created_at);",
 ]
 
+# Indexes superseded by the composite indexes above
+DROP_INDEXES_SQL = [
+    "DROP INDEX IF EXISTS idx_ts;",
+    "DROP INDEX IF EXISTS idx_from_msisdn;",
+]
+
+# Trigram full-text index over message text, kept in sync by triggers.
+# Lets `text LIKE '%...%'` searches use an index instead of a table scan.
+# It is keyed on the implicit rowid, which VACUUM may renumber for tables
+# without an INTEGER PRIMARY KEY: after any VACUUM, run REBUILD_FTS_SQL.
+CREATE_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        text, content='messages', content_rowid='rowid', tokenize='trigram'
+    );
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, text) VALUES (new.rowid, new.text);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+        INSERT INTO messages_fts(rowid, text) VALUES (new.rowid, new.text);
+    END;
+    """,
+]
+
+# Repopulate the full-text index from the messages table
+REBUILD_FTS_SQL = "INSERT INTO messages_fts(messages_fts) VALUES ('rebuild');"
+
+# Pragmas for schema setup. Only journal_mode=WAL is stored in the database
+# file (readers proceed during writes); busy_timeout covers init_db itself.
+INIT_PRAGMAS_SQL = [
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA busy_timeout=5000;",
+]
+
+# Per-connection pragmas (not persisted in the database file), applied to
+# every pooled and write connection: synchronous=NORMAL avoids an fsync on
+# every commit, and temp tables, a 256 MiB mmap and a 64 MiB page cache
+# keep reads in memory
+CONNECTION_PRAGMAS_SQL = [
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA busy_timeout=5000;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA mmap_size=268435456;",
+    "PRAGMA cache_size=-65536;",
+]
+
+# Filesystem path of the SQLite database, resolved once
+DB_PATH = settings.db_path
+
+# Long-lived connections, opened during the app lifespan
+DB_POOL: Optional[asyncio.Queue] = None
+WRITE_CONN: Optional[aiosqlite.Connection] = None
+
 
 async def init_db():
     """
     Initialize database schema.
-    Creates tables and indexes if they don't exist.
+    Creates tables, indexes and the full-text index if they don't exist.
     """
-    db_path = settings.DATABASE_URL.replace("sqlite:///", "")
-    
-    async with aiosqlite.connect(db_path) as db:
+    async with aiosqlite.connect(DB_PATH) as db:
+        # Configure journaling and caching
+        for pragma_sql in INIT_PRAGMAS_SQL:
+            await db.execute(pragma_sql)
+        
         # Create table
         await db.execute(CREATE_TABLE_SQL)
         
+        # Add the created_at default to tables from older schema versions
+        cursor = await db.execute("PRAGMA table_info(messages)")
+        columns = {row[1]: row for row in await cursor.fetchall()}
+        if columns["created_at"][4] is None:
+            for migrate_sql in MIGRATE_CREATED_AT_DEFAULT_SQL:
+                await db.execute(migrate_sql)
+        
         # Create indexes
-        for index_sql in CREATE_INDEXES_SQL:
+        for index_sql in DROP_INDEXES_SQL + CREATE_INDEXES_SQL:
             await db.execute(index_sql)
         
+        # Create full-text index, backfilling it for pre-existing rows
+        cursor = await db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages_fts'"
+        )
+        fts_exists = await cursor.fetchone() is not None
+        for fts_sql in CREATE_FTS_SQL:
+            await db.execute(fts_sql)
+        if not fts_exists:
+            await db.execute(REBUILD_FTS_SQL)
+        
         await db.commit()
 
 
+async def open_connection() -> aiosqlite.Connection:
+    """
+    Open a configured database connection.
+    
+    Returns:
+        Connection with row factory and per-connection pragmas applied
+    """
+    db = await aiosqlite.connect(DB_PATH)
+    db.row_factory = aiosqlite.Row
+    for pragma_sql in CONNECTION_PRAGMAS_SQL:
+        await db.execute(pragma_sql)
+    return db
+
+
+async def open_pool():
+    """
+    Open the read connection pool and the dedicated write connection.
+    SQLite allows a single writer, so all inserts share one connection.
+    """
+    global DB_POOL, WRITE_CONN
+    
+    pool = asyncio.Queue()
+    for _ in range(settings.DB_POOL_SIZE):
+        pool.put_nowait(await open_connection())
+    
+    DB_POOL = pool
+    WRITE_CONN = await open_connection()
+
+
+async def close_pool():
+    """Close all pooled connections and the write connection."""
+    global DB_POOL, WRITE_CONN
+    
+    if DB_POOL is not None:
+        while not DB_POOL.empty():
+            await DB_POOL.get_nowait().close()
+        DB_POOL = None
+    
+    if WRITE_CONN is not None:
+        await WRITE_CONN.close()
+        WRITE_CONN = None
+
+
 @asynccontextmanager
 async def get_db_connection():
     """
-    Get async database connection context manager.
+    Get a read connection from the pool.
+    Falls back to a short-lived connection when the pool is not open
+    (e.g. outside the application lifespan).
     
     Usage:
         async with get_db_connection() as db:
             # use db
     """
-    db_path = settings.DATABASE_URL.replace("sqlite:///", "")
-    db = await aiosqlite.connect(db_path)
-    db.row_factory = aiosqlite.Row
+    if DB_POOL is None:
+        db = await open_connection()
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+    
+    pool = DB_POOL
+    db = await pool.get()
     try:
         yield db
     finally:
-        await db.close()
+        pool.put_nowait(db)
+
+
+@asynccontextmanager
+async def get_write_connection():
+    """
+    Get the shared write connection.
+    Falls back to a short-lived connection when the pool is not open.
+    
+    Usage:
+        async with get_write_connection() as db:
+            # use db
+    """
+    if WRITE_CONN is None:
+        async with get_db_connection() as db:
+            yield db
+        return
+    
+    yield WRITE_CONN
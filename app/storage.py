@@ -3,10 +3,21 @@ Database storage operations.
 Handles message insertion, retrieval, and statistics.
 """
 
-from datetime import datetime
+import asyncio
+import time
 from typing import List, Dict, Tuple, Optional
 import aiosqlite
-from app.models import get_db_connection
+from app.config import settings
+from app.models import get_db_connection, get_write_connection
+
+
+# Cached /stats result; "version" is bumped on every write so a result
+# computed concurrently with an insert is never stored as fresh
+_STATS_CACHE = {"at": 0.0, "value": None, "version": 0}
+
+# Pending inserts for the batch writer: ((row params), future) or None to stop
+_INSERT_QUEUE: Optional[asyncio.Queue] = None
+_INSERT_TASK: Optional[asyncio.Task] = None
 
 
 async def insert_message(
@@ -31,21 +42,170 @@ async def insert_message(
     Returns:
         True if message was inserted, False if duplicate
     """
-    created_at = datetime.utcnow().isoformat() + "Z"
+    cursor = await db.execute(
+        """
+        INSERT OR IGNORE INTO messages (message_id, from_msisdn, to_msisdn, ts, text)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (message_id, from_msisdn, to_msisdn, ts, text),
+    )
+    await db.commit()
+    
+    # Duplicate message_id (PRIMARY KEY conflict) is ignored: no row changed
+    was_inserted = cursor.rowcount == 1
+    if was_inserted:
+        invalidate_stats_cache()
+    return was_inserted
+
+
+async def insert_messages(
+    db: aiosqlite.Connection,
+    rows: List[Tuple],
+) -> List[bool]:
+    """
+    Insert a batch of messages in a single statement and transaction.
+    
+    Args:
+        db: Database connection
+        rows: Tuples of (message_id, from_msisdn, to_msisdn, ts, text)
+    
+    Returns:
+        One flag per row: True if inserted, False if duplicate
+    """
+    placeholders = ", ".join(["(?, ?, ?, ?, ?)"] * len(rows))
+    params = [value for row in rows for value in row]
     
+    cursor = await db.execute(
+        f"""
+        INSERT OR IGNORE INTO messages (message_id, from_msisdn, to_msisdn, ts, text)
+        VALUES {placeholders}
+        RETURNING message_id
+        """,
+        params,
+    )
+    inserted_ids = {row[0] for row in await cursor.fetchall()}
+    await cursor.close()
+    await db.commit()
+    if inserted_ids:
+        invalidate_stats_cache()
+    
+    # Only the first occurrence of a message_id within the batch was inserted
+    results = []
+    for row in rows:
+        message_id = row[0]
+        results.append(message_id in inserted_ids)
+        inserted_ids.discard(message_id)
+    return results
+
+
+async def _flush_insert_batch(batch: List[Tuple[Tuple, asyncio.Future]]):
+    """Commit one batch of queued inserts and resolve their futures."""
     try:
-        await db.execute(
-            """
-            INSERT INTO messages (message_id, from_msisdn, to_msisdn, ts, text, created_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (message_id, from_msisdn, to_msisdn, ts, text, created_at),
-        )
-        await db.commit()
-        return True
-    except aiosqlite.IntegrityError:
-        # Duplicate message_id (PRIMARY KEY violation)
-        return False
+        async with get_write_connection() as db:
+            results = await insert_messages(db, [row for row, _ in batch])
+    except Exception as exc:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(exc)
+        return
+    
+    for (_, future), was_inserted in zip(batch, results):
+        if not future.done():
+            future.set_result(was_inserted)
+
+
+async def _insert_batch_loop(queue: asyncio.Queue):
+    """
+    Drain queued inserts into batches of up to INSERT_BATCH_SIZE rows,
+    waiting up to INSERT_BATCH_WINDOW_MS for a batch to fill.
+    """
+    batch_size = settings.INSERT_BATCH_SIZE
+    window = settings.INSERT_BATCH_WINDOW_MS / 1000
+    stopping = False
+    
+    while not stopping:
+        item = await queue.get()
+        if item is None:
+            break
+        batch = [item]
+        
+        waited = False
+        while len(batch) < batch_size:
+            if queue.empty():
+                if waited or window <= 0:
+                    break
+                await asyncio.sleep(window)
+                waited = True
+                continue
+            item = queue.get_nowait()
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+        
+        await _flush_insert_batch(batch)
+
+
+async def start_insert_batcher():
+    """Start the background task that batches webhook inserts."""
+    global _INSERT_QUEUE, _INSERT_TASK
+    
+    _INSERT_QUEUE = asyncio.Queue()
+    _INSERT_TASK = asyncio.create_task(_insert_batch_loop(_INSERT_QUEUE))
+
+
+async def stop_insert_batcher():
+    """Flush pending inserts and stop the batch writer."""
+    global _INSERT_QUEUE, _INSERT_TASK
+    
+    if _INSERT_QUEUE is None or _INSERT_TASK is None:
+        return
+    
+    queue, task = _INSERT_QUEUE, _INSERT_TASK
+    _INSERT_QUEUE = None
+    _INSERT_TASK = None
+    
+    queue.put_nowait(None)
+    await task
+
+
+async def submit_message(
+    message_id: str,
+    from_msisdn: str,
+    to_msisdn: str,
+    ts: str,
+    text: Optional[str],
+) -> bool:
+    """
+    Insert a message through the batch writer.
+    Falls back to a direct insert when the batch writer is not running.
+    
+    Args:
+        message_id: Unique message identifier
+        from_msisdn: Sender phone number
+        to_msisdn: Recipient phone number
+        ts: Message timestamp (ISO-8601)
+        text: Message text content
+    
+    Returns:
+        True if message was inserted, False if duplicate
+    """
+    if _INSERT_QUEUE is None:
+        async with get_write_connection() as db:
+            return await insert_message(
+                db,
+                message_id=message_id,
+                from_msisdn=from_msisdn,
+                to_msisdn=to_msisdn,
+                ts=ts,
+                text=text,
+            )
+    
+    future = asyncio.get_running_loop().create_future()
+    _INSERT_QUEUE.put_nowait(
+        ((message_id, from_msisdn, to_msisdn, ts, text), future)
+    )
+    return await future
 
 
 async def get_messages(
@@ -83,17 +243,24 @@ async def get_messages(
         params.append(since)
     
     if search_text:
-        where_clauses.append("text LIKE ?")
+        where_clauses.append(
+            "rowid IN (SELECT rowid FROM messages_fts WHERE text LIKE ?)"
+        )
         params.append(f"%{search_text}%")
     
     where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
     
-    # Get total count
+    # Get total count; a separate query lets the page below stop after
+    # LIMIT rows on the ordered index instead of reading every match
     count_query = f"SELECT COUNT(*) FROM messages WHERE {where_sql}"
     cursor = await db.execute(count_query, params)
     row = await cursor.fetchone()
     total = row[0] if row else 0
     
+    # Nothing to fetch at or past the end of the results
+    if offset >= total:
+        return [], total
+    
     # Get paginated results with deterministic ordering
     data_query = f"""
         SELECT message_id, from_msisdn AS "from", to_msisdn AS "to", ts, text
@@ -111,9 +278,17 @@ async def get_messages(
     return messages, total
 
 
+def invalidate_stats_cache():
+    """Discard the cached /stats result after the messages table changes."""
+    _STATS_CACHE["at"] = 0.0
+    _STATS_CACHE["value"] = None
+    _STATS_CACHE["version"] += 1
+
+
 async def get_stats(db: aiosqlite.Connection) -> Dict:
     """
     Calculate message-level statistics.
+    Results are cached for STATS_CACHE_TTL_SECONDS or until the next insert.
     
     Args:
         db: Database connection
@@ -121,15 +296,24 @@ async def get_stats(db: aiosqlite.Connection) -> Dict:
     Returns:
         Dictionary with statistics
     """
-    # Total messages
-    cursor = await db.execute("SELECT COUNT(*) FROM messages")
-    row = await cursor.fetchone()
-    total_messages = row[0] if row else 0
+    now = time.monotonic()
+    if (
+        _STATS_CACHE["value"] is not None
+        and now - _STATS_CACHE["at"] < settings.STATS_CACHE_TTL_SECONDS
+    ):
+        return _STATS_CACHE["value"]
+    version = _STATS_CACHE["version"]
     
-    # Unique senders count
-    cursor = await db.execute("SELECT COUNT(DISTINCT from_msisdn) FROM messages")
+    # Totals, unique senders and first/last timestamps in a single scan
+    cursor = await db.execute("""
+        SELECT COUNT(*), COUNT(DISTINCT from_msisdn), MIN(ts), MAX(ts)
+        FROM messages
+    """)
     row = await cursor.fetchone()
-    senders_count = row[0] if row else 0
+    total_messages = row[0] if row else 0
+    senders_count = row[1] if row else 0
+    first_message_ts = row[2] if row and row[2] else None
+    last_message_ts = row[3] if row and row[3] else None
     
     # Top senders (up to 10)
     cursor = await db.execute("""
@@ -142,19 +326,19 @@ async def get_stats(db: aiosqlite.Connection) -> Dict:
     rows = await cursor.fetchall()
     messages_per_sender = [dict(row) for row in rows]
     
-    # First and last message timestamps
-    cursor = await db.execute("SELECT MIN(ts), MAX(ts) FROM messages")
-    row = await cursor.fetchone()
-    first_message_ts = row[0] if row and row[0] else None
-    last_message_ts = row[1] if row and row[1] else None
-    
-    return {
+    stats = {
         "total_messages": total_messages,
         "senders_count": senders_count,
         "messages_per_sender": messages_per_sender,
         "first_message_ts": first_message_ts,
         "last_message_ts": last_message_ts,
     }
+    
+    if _STATS_CACHE["version"] == version:
+        _STATS_CACHE["at"] = now
+        _STATS_CACHE["value"] = stats
+    
+    return stats
 
 
 async def check_db_ready() -> bool:
@@ -0,0 +1,140 @@
+"""
+Shared helpers for signing and seeding webhook messages in tests.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import orjson
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Union
+from httpx import AsyncClient
+from app.config import settings
+
+
+# Webhook secret encoded once for all signatures, keyed into an HMAC
+# template that is copied per body (same approach as app.main)
+_SECRET_BYTES = settings.WEBHOOK_SECRET.encode()
+_HMAC_TEMPLATE = hmac.new(_SECRET_BYTES, b"", hashlib.sha256)
+
+
+@lru_cache(maxsize=256)
+def compute_signature(body: bytes) -> str:
+    """
+    Compute HMAC-SHA256 signature of body with the test webhook secret.
+    The secret is fixed, so results are cached by body bytes.
+    """
+    mac = _HMAC_TEMPLATE.copy()
+    mac.update(body)
+    return mac.hexdigest()
+
+
+# Signed bodies by message_id: message_id -> (message, body, signature)
+_SIGN_CACHE: Dict[str, Tuple[dict, bytes, str]] = {}
+
+
+def signed_body(message: dict) -> Tuple[bytes, str]:
+    """
+    Serialize and sign a message once, reusing the result for repeats.
+    Cache hits return the stored body bytes and hex signature as-is, so
+    neither serialization nor hex encoding runs again.
+    """
+    cached = _SIGN_CACHE.get(message["message_id"])
+    if cached is not None and cached[0] == message:
+        return cached[1], cached[2]
+    
+    body = orjson.dumps(message, option=orjson.OPT_SORT_KEYS)
+    signature = compute_signature(body)
+    # Store a copy: a caller mutating its dict in place must not match the cache
+    _SIGN_CACHE[message["message_id"]] = (dict(message), body, signature)
+    return body, signature
+
+
+class ASGIResponse:
+    """Minimal response captured from a direct ASGI call."""
+    
+    def __init__(self, status_code: int, content: bytes):
+        self.status_code = status_code
+        self.content = content
+    
+    def json(self):
+        return orjson.loads(self.content)
+
+
+class ASGIClient:
+    """
+    Bare-bones client that invokes an ASGI app directly.
+    Skips httpx request building and response parsing; meant for seeding
+    data, not for asserting on HTTP details.
+    """
+    
+    def __init__(self, app, headers: Optional[Dict[str, str]] = None):
+        self.app = app
+        self.headers = headers or {}
+    
+    async def post(
+        self,
+        url: str,
+        content: bytes = b"",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> ASGIResponse:
+        """POST raw bytes to a path on the app."""
+        raw_headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in {**self.headers, **(headers or {})}.items()
+        ]
+        raw_headers.append((b"content-length", str(len(content)).encode()))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": url,
+            "raw_path": url.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": raw_headers,
+            "client": ("testclient", 50000),
+            "server": ("test", 80),
+        }
+        
+        request_sent = False
+        response_complete = asyncio.Event()
+        status_code = 500
+        body_parts = []
+        
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": content, "more_body": False}
+            await response_complete.wait()
+            return {"type": "http.disconnect"}
+        
+        async def send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_complete.set()
+        
+        await self.app(scope, receive, send)
+        response_complete.set()
+        return ASGIResponse(status_code, b"".join(body_parts))
+
+
+async def seed_message(client: Union[AsyncClient, ASGIClient], message: dict):
+    """
+    Helper to seed a message via webhook.
+    Accepts the httpx client or the direct ASGIClient.
+    """
+    body, signature = signed_body(message)
+    
+    await client.post(
+        "/webhook",
+        content=body,
+        headers={"X-Signature": signature}
+    )
@@ -3,47 +3,97 @@ Test configuration for pytest.
 Sets up async test environment and database isolation.
 """
 
-import pytest
 import os
 import tempfile
-from app.config import settings
+
+# Point settings at a temporary database before any app module is imported
+_TEMP_DB = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+_TEMP_DB.close()
+os.environ["DATABASE_URL"] = f"sqlite:///{_TEMP_DB.name}"
+
+# Set test webhook secret
+os.environ["WEBHOOK_SECRET"] = "test_secret_key_for_testing"
+
+import asyncio
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from pytest_asyncio import is_async_test
+
+from app.main import app
+from tests._webhook_helpers import ASGIClient
+
+
+# Default headers for every test request
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def pytest_collection_modifyitems(items):
+    """Run every async test in the session event loop shared by `client`."""
+    session_loop = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if is_async_test(item):
+            item.add_marker(session_loop, append=False)
+
+
+@pytest.fixture(scope="session")
+def event_loop_policy():
+    """Run the test session on uvloop when it is installed."""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.DefaultEventLoopPolicy()
+    return uvloop.EventLoopPolicy()
 
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_environment():
-    """Set up test environment before running tests."""
-    # Use temporary file database for tests
-    temp_db = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
-    temp_db.close()
-    os.environ["DATABASE_URL"] = f"sqlite:///{temp_db.name}"
-    
-    # Set test webhook secret
-    os.environ["WEBHOOK_SECRET"] = "test_secret_key_for_testing"
-    
-    # Force reload settings
-    import importlib
-    import app.config
-    importlib.reload(app.config)
-    
-    print(f"Test DB URL: {temp_db.name}")
+    """Provide the temporary test database and remove it afterwards."""
+    print(f"Test DB URL: {_TEMP_DB.name}")
     
-    yield temp_db.name
+    yield _TEMP_DB.name
     
-    # Cleanup
-    try:
-        os.unlink(temp_db.name)
-    except:
-        pass
+    # Cleanup (including WAL side files)
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.unlink(_TEMP_DB.name + suffix)
+        except OSError:
+            pass
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def client():
+    """
+    Shared HTTP client bound to the app for the whole test session.
+    The app lifespan (schema setup, connection pool, insert batcher) is
+    entered once here; ASGITransport does not send lifespan events itself.
+    """
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(
+            transport=ASGITransport(app=app),
+            base_url="http://test",
+            trust_env=False,
+            headers=JSON_HEADERS,
+        ) as c:
+            yield c
+
+
+@pytest.fixture(scope="session")
+def fast_client(client):
+    """Direct ASGI client for seeding data without httpx overhead."""
+    return ASGIClient(app, headers=JSON_HEADERS)
 
 
-@pytest.fixture(autouse=True)
-async def reset_database():
+@pytest_asyncio.fixture(autouse=True, loop_scope="session")
+async def reset_database(client):
     """Clear database before each test."""
     from app.models import get_db_connection
+    from app.storage import invalidate_stats_cache
     
     # Delete all messages before each test
     async with get_db_connection() as db:
         await db.execute("DELETE FROM messages")
         await db.commit()
+    invalidate_stats_cache()
     
     yield
@@ -0,0 +1,46 @@
+"""
+Test suite for request logging.
+Covers the direct-write path used for successful requests.
+"""
+
+import pytest
+from app import logging_utils
+from tests._webhook_helpers import signed_body
+
+
+class BrokenStream:
+    """Log stream whose writes fail like a closed stdout pipe."""
+    
+    def write(self, data):
+        raise BrokenPipeError("stdout closed")
+    
+    def flush(self):
+        raise BrokenPipeError("stdout closed")
+
+
+@pytest.fixture
+def broken_log_stream(monkeypatch):
+    """Swap the log handler's stream for one that always fails."""
+    monkeypatch.setattr(logging_utils.handler, "stream", BrokenStream())
+
+
+@pytest.mark.asyncio
+async def test_log_write_failure_keeps_response(client, broken_log_stream):
+    """Test a failing log stream does not turn successful requests into 500s."""
+    response = await client.get("/health/live")
+    assert response.status_code == 200
+    
+    body, signature = signed_body({
+        "message_id": "log_failure_1",
+        "from": "+919876543210",
+        "to": "+14155550100",
+        "ts": "2025-01-15T10:00:00Z",
+        "text": "Logged to a broken stream"
+    })
+    response = await client.post(
+        "/webhook",
+        content=body,
+        headers={"X-Signature": signature}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
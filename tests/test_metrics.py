@@ -0,0 +1,39 @@
+"""
+Test suite for /metrics labels.
+Covers labelling HTTP metrics by route template.
+"""
+
+import pytest
+from app.metrics import REGISTRY, UNMATCHED_PATH
+
+
+def request_count(path: str, status: str) -> float:
+    """Current http_requests_total value for a GET series (0 if absent)."""
+    return REGISTRY.get_sample_value(
+        "http_requests_total",
+        {"method": "GET", "path": path, "status": status},
+    ) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_metrics_labelled_by_route_template(client):
+    """Test requests are counted under their route template, unknown URLs under one label."""
+    messages_before = request_count("/messages", "200")
+    unmatched_before = request_count(UNMATCHED_PATH, "404")
+    
+    response = await client.get("/messages?limit=1")
+    assert response.status_code == 200
+    response = await client.get("/nope/123")
+    assert response.status_code == 404
+    
+    assert request_count("/messages", "200") == messages_before + 1
+    assert request_count(UNMATCHED_PATH, "404") == unmatched_before + 1
+    
+    # Raw paths never become label values
+    raw_path_samples = [
+        sample
+        for metric in REGISTRY.collect()
+        for sample in metric.samples
+        if sample.labels.get("path") == "/nope/123"
+    ]
+    assert raw_path_samples == []
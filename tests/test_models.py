@@ -0,0 +1,123 @@
+"""
+Test suite for database initialization.
+Covers schema upgrades from older versions and connection setup.
+"""
+
+import sqlite3
+import pytest
+from app import models
+from app.models import CREATE_FTS_SQL, get_db_connection, init_db, open_connection
+from app.storage import get_messages
+
+
+# messages table as created before created_at had a default
+LEGACY_TABLE_SQL = """
+CREATE TABLE messages (
+    message_id TEXT PRIMARY KEY,
+    from_msisdn TEXT NOT NULL,
+    to_msisdn TEXT NOT NULL,
+    ts TEXT NOT NULL,
+    text TEXT,
+    created_at TEXT NOT NULL
+);
+"""
+
+LEGACY_INDEXES_SQL = [
+    "CREATE INDEX idx_from_msisdn ON messages(from_msisdn);",
+    "CREATE INDEX idx_ts ON messages(ts);",
+    "CREATE INDEX idx_created_at ON messages(created_at);",
+]
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """Database file with the legacy schema, full-text index and a few rows."""
+    db_path = str(tmp_path / "legacy.db")
+    
+    conn = sqlite3.connect(db_path)
+    conn.execute(LEGACY_TABLE_SQL)
+    for index_sql in LEGACY_INDEXES_SQL:
+        conn.execute(index_sql)
+    for fts_sql in CREATE_FTS_SQL:
+        conn.execute(fts_sql)
+    conn.executemany(
+        "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (f"legacy_{i}", "+919876543210", "+14155550100",
+             f"2025-01-15T10:0{i}:00Z", f"legacy message {i}", "2025-01-15T10:00:00Z")
+            for i in range(5)
+        ],
+    )
+    # Leave a gap in the rowids so preservation is observable
+    conn.execute("DELETE FROM messages WHERE message_id = 'legacy_1'")
+    conn.commit()
+    conn.close()
+    
+    monkeypatch.setattr(models, "DB_PATH", db_path)
+    return db_path
+
+
+@pytest.mark.asyncio
+async def test_init_db_migrates_legacy_created_at(legacy_db):
+    """Test init_db adds the created_at default without losing rows or rowids."""
+    conn = sqlite3.connect(legacy_db)
+    rowids_before = conn.execute(
+        "SELECT message_id, rowid FROM messages ORDER BY message_id"
+    ).fetchall()
+    conn.close()
+    
+    # Running twice must leave the migrated table as is
+    await init_db()
+    await init_db()
+    
+    conn = sqlite3.connect(legacy_db)
+    rowids_after = conn.execute(
+        "SELECT message_id, rowid FROM messages ORDER BY message_id"
+    ).fetchall()
+    columns = {row[1]: row for row in conn.execute("PRAGMA table_info(messages)")}
+    
+    # New rows get created_at from the column default
+    conn.execute(
+        "INSERT INTO messages (message_id, from_msisdn, to_msisdn, ts, text) "
+        "VALUES ('after_migration', '+919876543210', '+14155550100', "
+        "'2025-01-15T11:00:00Z', 'message after migration')"
+    )
+    conn.commit()
+    created_at = conn.execute(
+        "SELECT created_at FROM messages WHERE message_id = 'after_migration'"
+    ).fetchone()[0]
+    conn.close()
+    
+    assert len(rowids_after) == 4
+    assert rowids_after == rowids_before
+    assert columns["created_at"][4] is not None
+    assert created_at.endswith("Z")
+    
+    # Text search still finds migrated rows and rows inserted afterwards
+    db = await open_connection()
+    try:
+        legacy_rows, legacy_total = await get_messages(db, search_text="legacy message 3")
+        _, all_total = await get_messages(db, search_text="message")
+    finally:
+        await db.close()
+    
+    assert legacy_total == 1
+    assert legacy_rows[0]["message_id"] == "legacy_3"
+    assert all_total == 5
+
+
+@pytest.mark.asyncio
+async def test_pooled_connection_pragmas(client):
+    """Test pooled connections carry the per-connection tuning pragmas."""
+    async with get_db_connection() as db:
+        pragmas = {}
+        for name in ("journal_mode", "temp_store", "mmap_size", "cache_size"):
+            cursor = await db.execute(f"PRAGMA {name}")
+            pragmas[name] = (await cursor.fetchone())[0]
+    
+    assert pragmas == {
+        "journal_mode": "wal",
+        "temp_store": 2,
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+    }
@@ -3,213 +3,236 @@ Test suite for /webhook endpoint.
 Covers signature verification, validation, and idempotency.
 """
 
+import asyncio
 import pytest
-import hmac
-import hashlib
-import json
-from httpx import AsyncClient
-from app.main import app
+import orjson
 from app.config import settings
+from app.metrics import REGISTRY
+from tests._webhook_helpers import compute_signature
 
 
-@pytest.fixture
-def valid_message():
-    """Sample valid message payload."""
-    return {
-        "message_id": "test_msg_1",
-        "from": "+919876543210",
-        "to": "+14155550100",
-        "ts": "2025-01-15T10:00:00Z",
-        "text": "Hello, this is a test message"
-    }
+# Sample valid message, serialized and signed once at import
+VALID_MESSAGE = {
+    "message_id": "test_msg_1",
+    "from": "+919876543210",
+    "to": "+14155550100",
+    "ts": "2025-01-15T10:00:00Z",
+    "text": "Hello, this is a test message"
+}
+VALID_MESSAGE_BYTES = orjson.dumps(VALID_MESSAGE)
+VALID_MESSAGE_SIGNATURE = compute_signature(VALID_MESSAGE_BYTES)
 
 
-def compute_signature(body: str, secret: str) -> str:
-    """Compute HMAC-SHA256 signature of body."""
-    return hmac.new(
-        secret.encode(),
-        body.encode(),
-        hashlib.sha256
-    ).hexdigest()
+@pytest.fixture
+def valid_message():
+    """Sample valid message payload as JSON bytes."""
+    return VALID_MESSAGE_BYTES
 
 
 @pytest.mark.asyncio
-async def test_webhook_missing_signature(valid_message):
+async def test_webhook_missing_signature(client, valid_message):
     """Test webhook without X-Signature header returns 401."""
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        response = await client.post(
-            "/webhook",
-            json=valid_message,
-        )
+    response = await client.post(
+        "/webhook",
+        content=valid_message,
+    )
     
     assert response.status_code == 401
     assert response.json() == {"detail": "invalid signature"}
 
 
 @pytest.mark.asyncio
-async def test_webhook_invalid_signature(valid_message):
+async def test_webhook_invalid_signature(client, valid_message):
     """Test webhook with invalid signature returns 401."""
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        response = await client.post(
-            "/webhook",
-            json=valid_message,
-            headers={"X-Signature": "invalid_signature_123"}
-        )
+    response = await client.post(
+        "/webhook",
+        content=valid_message,
+        headers={"X-Signature": "invalid_signature_123"}
+    )
     
     assert response.status_code == 401
     assert response.json() == {"detail": "invalid signature"}
 
 
 @pytest.mark.asyncio
-async def test_webhook_valid_signature_success(valid_message):
-    """Test webhook with valid signature inserts message successfully."""
-    body = json.dumps(valid_message)
-    signature = compute_signature(body, settings.WEBHOOK_SECRET)
+@pytest.mark.parametrize(
+    "signature",
+    [
+        VALID_MESSAGE_SIGNATURE[:-2],
+        VALID_MESSAGE_SIGNATURE + "00",
+        VALID_MESSAGE_SIGNATURE.upper(),
+        " ".join(
+            VALID_MESSAGE_SIGNATURE[i:i + 2] for i in range(0, len(VALID_MESSAGE_SIGNATURE), 2)
+        ),
+    ],
+    ids=["too_short", "too_long", "uppercase", "spaced"],
+)
+async def test_webhook_malformed_signature(client, valid_message, signature):
+    """Test webhook rejects signatures that are not exactly the lowercase hex digest."""
+    response = await client.post(
+        "/webhook",
+        content=valid_message,
+        headers={"X-Signature": signature}
+    )
     
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        response = await client.post(
-            "/webhook",
-            content=body,
-            headers={
-                "Content-Type": "application/json",
-                "X-Signature": signature
-            }
-        )
+    assert response.status_code == 401
+    assert response.json() == {"detail": "invalid signature"}
+
+
+@pytest.mark.asyncio
+async def test_webhook_valid_signature_success(client, valid_message):
+    """Test webhook with valid signature inserts message successfully."""
+    response = await client.post(
+        "/webhook",
+        content=valid_message,
+        headers={"X-Signature": VALID_MESSAGE_SIGNATURE}
+    )
     
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
 
 
 @pytest.mark.asyncio
-async def test_webhook_idempotency(valid_message):
+async def test_webhook_idempotency(client, valid_message):
     """Test duplicate message_id returns 200 without inserting again."""
-    body = json.dumps(valid_message)
-    signature = compute_signature(body, settings.WEBHOOK_SECRET)
+    # First request - should insert
+    response1 = await client.post(
+        "/webhook",
+        content=valid_message,
+        headers={"X-Signature": VALID_MESSAGE_SIGNATURE}
+    )
+    assert response1.status_code == 200
     
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        # First request - should insert
-        response1 = await client.post(
-            "/webhook",
-            content=body,
-            headers={
-                "Content-Type": "application/json",
-                "X-Signature": signature
-            }
-        )
-        assert response1.status_code == 200
-        
-        # Second request - should be idempotent
-        response2 = await client.post(
-            "/webhook",
-            content=body,
-            headers={
-                "Content-Type": "application/json",
-                "X-Signature": signature
-            }
-        )
-        assert response2.status_code == 200
-        assert response2.json() == {"status": "ok"}
+    # Second request - should be idempotent
+    response2 = await client.post(
+        "/webhook",
+        content=valid_message,
+        headers={"X-Signature": VALID_MESSAGE_SIGNATURE}
+    )
+    assert response2.status_code == 200
+    assert response2.json() == {"status": "ok"}
 
 
 @pytest.mark.asyncio
-async def test_webhook_invalid_phone_format():
-    """Test webhook with invalid phone number format returns 422."""
-    message = {
-        "message_id": "test_invalid_phone",
-        "from": "919876543210",  # Missing + prefix
-        "to": "+14155550100",
-        "ts": "2025-01-15T10:00:00Z",
-        "text": "Test"
-    }
-    body = json.dumps(message)
-    signature = compute_signature(body, settings.WEBHOOK_SECRET)
+async def test_webhook_concurrent_duplicates(client, valid_message):
+    """Test concurrent posts of one message insert it exactly once."""
+    created_before = REGISTRY.get_sample_value(
+        "webhook_requests_total", {"result": "created"}
+    ) or 0.0
     
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        response = await client.post(
+    # Sent together so the batch writer sees the duplicates in one batch
+    responses = await asyncio.gather(*(
+        client.post(
             "/webhook",
-            content=body,
-            headers={
-                "Content-Type": "application/json",
-                "X-Signature": signature
-            }
+            content=valid_message,
+            headers={"X-Signature": VALID_MESSAGE_SIGNATURE}
         )
+        for _ in range(10)
+    ))
+    assert all(response.status_code == 200 for response in responses)
     
-    assert response.status_code == 422
+    created_after = REGISTRY.get_sample_value(
+        "webhook_requests_total", {"result": "created"}
+    )
+    assert created_after - created_before == 1
+    
+    response = await client.get("/messages")
+    assert response.json()["total"] == 1
 
 
-@pytest.mark.asyncio
-async def test_webhook_invalid_timestamp():
-    """Test webhook with invalid timestamp format returns 422."""
-    message = {
+# Payloads that must be rejected with 422 even when correctly signed
+INVALID_MESSAGES = {
+    "invalid_phone_format": {
+        "message_id": "test_invalid_phone",
+        "from": "919876543210",  # Missing + prefix
+        "to": "+14155550100",
+        "ts": "2025-01-15T10:00:00Z",
+        "text": "Test"
+    },
+    "invalid_timestamp": {
         "message_id": "test_invalid_ts",
         "from": "+919876543210",
         "to": "+14155550100",
         "ts": "2025-01-15 10:00:00",  # Missing Z suffix
         "text": "Test"
-    }
-    body = json.dumps(message)
-    signature = compute_signature(body, settings.WEBHOOK_SECRET)
-    
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        response = await client.post(
-            "/webhook",
-            content=body,
-            headers={
-                "Content-Type": "application/json",
-                "X-Signature": signature
-            }
-        )
-    
-    assert response.status_code == 422
-
-
-@pytest.mark.asyncio
-async def test_webhook_text_too_long():
-    """Test webhook with text exceeding 4096 characters returns 422."""
-    message = {
+    },
+    "invalid_calendar_timestamp": {
+        "message_id": "test_invalid_calendar_ts",
+        "from": "+919876543210",
+        "to": "+14155550100",
+        "ts": "2025-13-45T99:99:99Z",  # Matches the layout, not a real time
+        "text": "Test"
+    },
+    "non_ascii_digit_timestamp": {
+        "message_id": "test_non_ascii_ts",
+        "from": "+919876543210",
+        "to": "+14155550100",
+        "ts": "\uff12\uff10\uff12\uff15-01-15T10:00:00Z",  # Fullwidth year digits
+        "text": "Test"
+    },
+    "text_too_long": {
         "message_id": "test_long_text",
         "from": "+919876543210",
         "to": "+14155550100",
         "ts": "2025-01-15T10:00:00Z",
         "text": "x" * 5000  # Exceeds 4096 limit
-    }
-    body = json.dumps(message)
-    signature = compute_signature(body, settings.WEBHOOK_SECRET)
-    
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        response = await client.post(
-            "/webhook",
-            content=body,
-            headers={
-                "Content-Type": "application/json",
-                "X-Signature": signature
-            }
-        )
-    
-    assert response.status_code == 422
-
-
-@pytest.mark.asyncio
-async def test_webhook_missing_required_field():
-    """Test webhook with missing required field returns 422."""
-    message = {
+    },
+    "missing_required_field": {
         "message_id": "test_missing_field",
         "from": "+919876543210",
         # Missing "to" field
         "ts": "2025-01-15T10:00:00Z",
         "text": "Test"
-    }
-    body = json.dumps(message)
-    signature = compute_signature(body, settings.WEBHOOK_SECRET)
+    },
+}
+INVALID_MESSAGE_BYTES = {
+    name: orjson.dumps(message) for name, message in INVALID_MESSAGES.items()
+}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "body",
+    list(INVALID_MESSAGE_BYTES.values()),
+    ids=list(INVALID_MESSAGE_BYTES.keys()),
+)
+async def test_webhook_invalid_message(client, body):
+    """Test webhook with an invalid but correctly signed payload returns 422."""
+    signature = compute_signature(body)
     
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        response = await client.post(
-            "/webhook",
-            content=body,
-            headers={
-                "Content-Type": "application/json",
-                "X-Signature": signature
-            }
-        )
+    response = await client.post(
+        "/webhook",
+        content=body,
+        headers={"X-Signature": signature}
+    )
     
     assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_webhook_payload_too_large(client):
+    """Test webhook with body exceeding the size limit returns 413."""
+    message = dict(VALID_MESSAGE, text="x" * (settings.WEBHOOK_MAX_BODY_BYTES + 1))
+    body = orjson.dumps(message)
+    signature = compute_signature(body)
+    
+    response = await client.post(
+        "/webhook",
+        content=body,
+        headers={"X-Signature": signature}
+    )
+    
+    assert response.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_webhook_malformed_content_length(fast_client, valid_message):
+    """Test a malformed Content-Length header is ignored rather than failing with 500."""
+    response = await fast_client.post(
+        "/webhook",
+        content=valid_message,
+        headers={"X-Signature": VALID_MESSAGE_SIGNATURE, "Content-Length": "\u00b2"}
+    )
+    
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
@@ -1,19 +1,52 @@
 """Quick script to view SQLite database schema"""
+import json
 import sqlite3
+import sys
+
+# Schema metadata, aggregated into one JSON document by SQLite
+METADATA_FIELDS = """
+    'schema', (SELECT sql FROM sqlite_master WHERE type='table' AND name='messages'),
+    'indexes', json((
+        SELECT json_group_array(sql) FROM sqlite_master
+        WHERE type='index' AND tbl_name='messages' AND sql IS NOT NULL
+    )),
+    'columns', json((
+        SELECT json_group_array(json_array(cid, name, type, "notnull", dflt_value, pk))
+        FROM pragma_table_info('messages')
+    ))
+"""
+
+# Row count and sample rows (only valid once the table exists).
+# MAX(_rowid_) is a single b-tree seek instead of the full scan COUNT(*)
+# needs; it is exact unless rows have been deleted, then an upper bound.
+DATA_FIELDS = """,
+    'count', (SELECT COALESCE(MAX(_rowid_), 0) FROM messages),
+    'samples', json((
+        SELECT json_group_array(json_array(message_id, from_msisdn, to_msisdn, ts, text, created_at))
+        FROM (SELECT * FROM messages LIMIT 5)
+    ))
+"""
 
 # Connect to database
 conn = sqlite3.connect('local.db')
 cursor = conn.cursor()
 
+# Fetch everything in a single query
+try:
+    summary = json.loads(
+        cursor.execute(f"SELECT json_object({METADATA_FIELDS}{DATA_FIELDS})").fetchone()[0]
+    )
+except sqlite3.OperationalError:
+    summary = json.loads(
+        cursor.execute(f"SELECT json_object({METADATA_FIELDS})").fetchone()[0]
+    )
+
 # Get table schema
 print("=" * 60)
 print("MESSAGES TABLE SCHEMA")
 print("=" * 60)
-schema = cursor.execute(
-    "SELECT sql FROM sqlite_master WHERE type='table' AND name='messages'"
-).fetchone()
-if schema:
-    print(schema[0])
+if summary["schema"]:
+    print(summary["schema"])
 else:
     print("Table not created yet")
 
@@ -21,12 +54,8 @@ else:
 print("\n" + "=" * 60)
 print("INDEXES")
 print("=" * 60)
-indexes = cursor.execute(
-    "SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name='messages' AND sql IS NOT NULL"
-).fetchall()
-if indexes:
-    for idx in indexes:
-        print(idx[0])
+if summary["indexes"]:
+    print("\n".join(summary["indexes"]))
 else:
     print("No indexes yet")
 
@@ -34,12 +63,13 @@ else:
 print("\n" + "=" * 60)
 print("COLUMN DETAILS")
 print("=" * 60)
-table_info = cursor.execute("PRAGMA table_info(messages)").fetchall()
-if table_info:
+if summary["columns"]:
     print(f"{'CID':<5} {'Name':<15} {'Type':<10} {'NotNull':<10} {'Default':<10} {'PK':<5}")
     print("-" * 60)
-    for col in table_info:
-        print(f"{col[0]:<5} {col[1]:<15} {col[2]:<10} {col[3]:<10} {str(col[4]):<10} {col[5]:<5}")
+    sys.stdout.write("".join(
+        f"{col[0]:<5} {col[1]:<15} {col[2]:<10} {col[3]:<10} {str(col[4]):<10} {col[5]:<5}\n"
+        for col in summary["columns"]
+    ))
 else:
     print("Table not created yet")
 
@@ -47,17 +77,15 @@ else:
 print("\n" + "=" * 60)
 print("DATA SUMMARY")
 print("=" * 60)
-try:
-    count = cursor.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
-    print(f"Total messages: {count}")
+if "count" in summary:
+    count = summary["count"]
+    print(f"Total messages: ~{count} (highest rowid)")
     
     if count > 0:
         # Show sample data
         print("\nSample rows (first 5):")
-        samples = cursor.execute("SELECT * FROM messages LIMIT 5").fetchall()
-        for row in samples:
-            print(f"  {row}")
-except:
+        print("\n".join(f"  {tuple(row)}" for row in summary["samples"]))
+else:
     print("Table not accessible yet")
 
 conn.close()